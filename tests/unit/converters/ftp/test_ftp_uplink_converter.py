@@ -0,0 +1,87 @@
+from tests.unit.BaseUnitTest import BaseUnitTest
+from thingsboard_gateway.connectors.ftp.ftp_uplink_converter import FTPUplinkConverter
+
+
+class FtpUplinkConverterTest(BaseUnitTest):
+    def test_convert_table_view(self):
+        config = {
+            "devicePatternName": "${name}",
+            "devicePatternType": "default",
+            "delimiter": ";",
+            "txt_file_data_view": "TABLE",
+            "attributes": [{"key": "model", "value": "${model}", "type": "string"}],
+            "timeseries": [{"key": "temp", "value": "${temp}", "type": "double"}]
+        }
+        converter = FTPUplinkConverter(config, self.log)
+        convert_conf = {"file_ext": "csv", "headers": ["name", "model", "temp"]}
+
+        expected_first = {
+            "deviceName": "dev1",
+            "deviceType": "default",
+            "attributes": [{"model": "T1000"}],
+            "telemetry": [{"temp": "22.5"}]
+        }
+        expected_second = {
+            "deviceName": "dev2",
+            "deviceType": "default",
+            "attributes": [{"model": "T2000"}],
+            "telemetry": [{"temp": "23.5"}]
+        }
+
+        self.assertDictEqual(expected_first, converter.convert(convert_conf, "dev1;T1000;22.5"))
+        # second line reuses the cached header indices
+        self.assertDictEqual(expected_second, converter.convert(convert_conf, "dev2;T2000;23.5"))
+
+    def test_convert_sliced_view(self):
+        config = {
+            "devicePatternName": "[0:1]",
+            "devicePatternType": "default",
+            "delimiter": ";",
+            "txt_file_data_view": "SLICED",
+            "attributes": [{"key": "serial", "value": "[0:1]", "type": "string"}],
+            "timeseries": [{"key": "temp", "value": "[2:]", "type": "double"}]
+        }
+        converter = FTPUplinkConverter(config, self.log)
+        expected_result = {
+            "deviceName": "SN42",
+            "deviceType": "default",
+            "attributes": [{"serial": "SN42"}],
+            "telemetry": [{"temp": "24.5"}]
+        }
+
+        self.assertDictEqual(expected_result, converter.convert({"file_ext": "txt"}, "SN42;T4;24.5"))
+
+    def test_convert_json_file(self):
+        config = {
+            "devicePatternName": "${name}",
+            "devicePatternType": "default",
+            "attributes": [{"key": "model", "value": "${model}", "type": "string"}],
+            "timeseries": [{"key": "temp", "value": "${temp}", "type": "double"}]
+        }
+        converter = FTPUplinkConverter(config, self.log)
+        data = {"name": "dev3", "model": "T3000", "temp": 24.5, "ts": 1675000000000}
+        expected_result = {
+            "deviceName": "dev3",
+            "deviceType": "default",
+            "attributes": [{"model": "T3000"}],
+            "telemetry": [{"ts": 1675000000000, "values": {"temp": "24.5"}}]
+        }
+
+        self.assertDictEqual(expected_result, converter.convert({"file_ext": "json"}, data))
+
+    def test_convert_json_list_payload(self):
+        config = {
+            "devicePatternName": "dev4",
+            "devicePatternType": "default",
+            "attributes": [{"key": "first", "value": "${[0]}", "type": "string"}],
+            "timeseries": [{"key": "second", "value": "${[1]}", "type": "double"}]
+        }
+        converter = FTPUplinkConverter(config, self.log)
+        expected_result = {
+            "deviceName": "dev4",
+            "deviceType": "default",
+            "attributes": [{"first": "5"}],
+            "telemetry": [{"second": "7"}]
+        }
+
+        self.assertDictEqual(expected_result, converter.convert({"file_ext": "json"}, [5, 7]))
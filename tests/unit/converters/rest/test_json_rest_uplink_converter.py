@@ -0,0 +1,91 @@
+from tests.unit.BaseUnitTest import BaseUnitTest
+from thingsboard_gateway.connectors.rest.json_rest_uplink_converter import JsonRESTUplinkConverter
+
+
+class JsonRestUplinkConverterTest(BaseUnitTest):
+    DEFAULT_CONFIG = {
+        "deviceNameExpression": "Device ${name}",
+        "deviceTypeExpression": "default",
+        "attributes": [
+            {
+                "key": "model",
+                "value": "${model}",
+                "type": "string"
+            }
+        ],
+        "timeseries": [
+            {
+                "key": "temp",
+                "value": "${temp}",
+                "type": "double"
+            },
+            {
+                "key": "combo",
+                "value": "${a}-${b}",
+                "type": "string"
+            }
+        ]
+    }
+
+    def test_convert_templated_and_pure_expressions(self):
+        converter = JsonRESTUplinkConverter(self.DEFAULT_CONFIG, self.log)
+        data = {"name": "A1", "model": "T1000", "temp": 22.5, "a": 1, "b": 2}
+        expected_result = {
+            "deviceName": "Device A1",
+            "deviceType": "default",
+            "attributes": [{"model": "T1000"}],
+            "telemetry": [{"temp": "22.5"}, {"combo": "1-2"}]
+        }
+
+        self.assertDictEqual(expected_result, converter.convert(None, data))
+
+    def test_convert_literal_expressions(self):
+        config = {
+            "deviceNameExpression": "Static name",
+            "deviceTypeExpression": "default",
+            "attributes": [{"key": "version", "value": "1.0", "type": "string"}],
+            "timeseries": []
+        }
+        converter = JsonRESTUplinkConverter(config, self.log)
+
+        result = converter.convert(None, {"anything": 1})
+        self.assertEqual("Static name", result["deviceName"])
+        self.assertEqual("default", result["deviceType"])
+        self.assertEqual([{"version": "1.0"}], result["attributes"])
+        self.assertEqual([], result["telemetry"])
+
+    def test_convert_with_timestamp(self):
+        converter = JsonRESTUplinkConverter(self.DEFAULT_CONFIG, self.log)
+        data = {"name": "A1", "model": "T1000", "temp": 22.5, "a": 1, "b": 2, "ts": 1675000000000}
+
+        result = converter.convert(None, data)
+        self.assertEqual([{"ts": 1675000000000, "values": {"temp": "22.5"}},
+                          {"ts": 1675000000000, "values": {"combo": "1-2"}}],
+                         result["telemetry"])
+
+    def test_convert_list_payload(self):
+        config = {
+            "deviceNameExpression": "dev",
+            "deviceTypeExpression": "default",
+            "attributes": [{"key": "first", "value": "${[0]}", "type": "string"}],
+            "timeseries": [{"key": "second", "value": "${[1]}", "type": "double"}]
+        }
+        converter = JsonRESTUplinkConverter(config, self.log)
+        expected_result = {
+            "deviceName": "dev",
+            "deviceType": "default",
+            "attributes": [{"first": "5"}],
+            "telemetry": [{"second": "7"}]
+        }
+
+        self.assertDictEqual(expected_result, converter.convert(None, [5, 7]))
+
+    def test_convert_results_are_independent(self):
+        converter = JsonRESTUplinkConverter(self.DEFAULT_CONFIG, self.log)
+        first = converter.convert(None, {"name": "A1", "model": "T1000", "temp": 22.5, "a": 1, "b": 2})
+        second = converter.convert(None, {"name": "A2", "model": "T2000", "temp": 23.5, "a": 3, "b": 4})
+
+        self.assertEqual("Device A1", first["deviceName"])
+        self.assertEqual([{"model": "T1000"}], first["attributes"])
+        self.assertEqual("Device A2", second["deviceName"])
+        self.assertEqual([{"model": "T2000"}], second["attributes"])
@@ -15,6 +15,7 @@
 import io
 import re
 from ftplib import FTP, FTP_TLS
+from logging import DEBUG
 from queue import Queue
 from random import choice
 from re import fullmatch
@@ -22,7 +23,10 @@ from string import ascii_lowercase
 from threading import Thread
 from time import perf_counter as timer, sleep
 
-import simplejson
+try:
+    from orjson import loads
+except ImportError:
+    from simplejson import loads
 
 from thingsboard_gateway.connectors.ftp.file import File
 from thingsboard_gateway.connectors.ftp.ftp_uplink_converter import FTPUplinkConverter
@@ -149,12 +153,12 @@ class FTPConnector(Connector, Thread):
                         ftp.retrbinary('RETR ' + file.path_to_file, handle_stream.write)
 
                         handled_str = str(handle_stream.getvalue(), 'UTF-8')
-                        handled_array = handled_str.split('\n')
+                        handled_array = handled_str.splitlines()
 
                         convert_conf = {'file_ext': file.path_to_file.split('.')[-1]}
 
                         if convert_conf['file_ext'] == 'json':
-                            json_data = simplejson.loads(handled_str)
+                            json_data = loads(handled_str)
                             if isinstance(json_data, list):
                                 for obj in json_data:
                                     converted_data = converter.convert(convert_conf, obj)
@@ -184,7 +188,8 @@ class FTPConnector(Connector, Thread):
         if converted_data:
             self.__gateway.send_to_storage(self.getName(), self.get_id(), converted_data)
             self.statistics['MessagesSent'] = self.statistics['MessagesSent'] + 1
-            self.__log.debug("Data to ThingsBoard: %s", converted_data)
+            if self.__log.isEnabledFor(DEBUG):
+                self.__log.debug("Data to ThingsBoard: %s", converted_data)
 
     def close(self):
         self.__stopped = True
@@ -213,7 +218,7 @@ class FTPConnector(Connector, Thread):
     @staticmethod
     def __is_json(data):
         try:
-            simplejson.loads(data)
+            loads(data)
         except ValueError:
             return False
         return True
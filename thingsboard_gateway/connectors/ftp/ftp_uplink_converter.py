@@ -27,6 +27,18 @@ class FTPUplinkConverter(FTPConverter):
         self._log = logger
         self.__config = config
         self.__data_types = {"attributes": "attributes", "timeseries": "telemetry"}
+        txt_file_data_view = config.get('txt_file_data_view')
+        self.__converters_by_file_ext = {
+            'csv': self._convert_table_view_data,
+            'json': self._convert_json_file,
+        }
+        if txt_file_data_view == 'TABLE':
+            self.__converters_by_file_ext['txt'] = self._convert_table_view_data
+        elif txt_file_data_view == 'SLICED':
+            self.__converters_by_file_ext['txt'] = self._convert_slices_view_data
+        self.__table_view_headers = None
+        self.__table_view_indices = None
+        self.__sliced_view_entries = None
 
     def _get_required_data(self, left_symbol, right_symbol):
         dict_result = {"deviceName": None, "deviceType": None, "attributes": [], "telemetry": []}
@@ -44,33 +56,54 @@ class FTPUplinkConverter(FTPConverter):
 
         return dict_result, get_device_name_from_data, get_device_type_from_data
 
-    def _convert_table_view_data(self, config, data):
-        dict_result, get_device_name_from_data, get_device_type_from_data = self._get_required_data('${', '}')
-        try:
+    def __get_table_view_indices(self, config):
+        headers = config['headers']
+        if headers is not self.__table_view_headers:
+            indices = {}
             for data_type in self.__data_types:
+                entries = []
                 for information in self.__config[data_type]:
-                    arr = data.split(self.__config['delimiter'])
-
                     key_index = information['key']
                     val_index = information['value']
 
                     if '${' in information['key'] and '}' in information['key']:
-                        key_index = config['headers'].index(re.sub(r'[^\w]', '', information['key']))
+                        key_index = headers.index(re.sub(r'[^\w]', '', information['key']))
 
                     if '${' in information['value'] and '}' in information['value']:
-                        val_index = config['headers'].index(re.sub(r'[^\w]', '', information['value']))
+                        val_index = headers.index(re.sub(r'[^\w]', '', information['value']))
 
-                    dict_result[self.__data_types[data_type]].append({
-                        arr[key_index] if isinstance(key_index, int) else key_index:
-                            arr[val_index] if isinstance(val_index, int) else val_index
-                    })
+                    entries.append((key_index, val_index))
+                indices[data_type] = entries
 
-                    if get_device_name_from_data:
-                        index = config['headers'].index(re.sub(r'[^\w]', '', self.__config['devicePatternName']))
-                        dict_result['deviceName'] = arr[index]
-                    if get_device_type_from_data:
-                        index = config['headers'].index(re.sub(r'[^\w]', '', self.__config['devicePatternType']))
-                        dict_result['deviceType'] = arr[index]
+            for pattern_key in ('devicePatternName', 'devicePatternType'):
+                pattern = self.__config[pattern_key]
+                if '${' in pattern and '}' in pattern:
+                    indices[pattern_key] = headers.index(re.sub(r'[^\w]', '', pattern))
+
+            self.__table_view_headers = headers
+            self.__table_view_indices = indices
+
+        return self.__table_view_indices
+
+    def _convert_table_view_data(self, config, data):
+        dict_result, get_device_name_from_data, get_device_type_from_data = self._get_required_data('${', '}')
+        try:
+            arr = data.split(self.__config['delimiter'])
+            indices = self.__get_table_view_indices(config)
+
+            if get_device_name_from_data:
+                dict_result['deviceName'] = arr[indices['devicePatternName']]
+            if get_device_type_from_data:
+                dict_result['deviceType'] = arr[indices['devicePatternType']]
+
+            for data_type in self.__data_types:
+                section = {}
+                for key_index, val_index in indices[data_type]:
+                    section[arr[key_index] if isinstance(key_index, int) else key_index] = \
+                        arr[val_index] if isinstance(val_index, int) else val_index
+
+                if section:
+                    dict_result[self.__data_types[data_type]].append(section)
 
         except Exception as e:
             self._log.error('Error in converter, for config: \n%s\n and message: \n%s\n %s', dumps(self.__config), data,
@@ -79,54 +112,71 @@ class FTPUplinkConverter(FTPConverter):
         return dict_result
 
     @staticmethod
-    def _get_key_or_value(key, arr):
+    def _parse_key_or_value(key):
         if '[' in key and ']' in key:
             split_val_arr = key[1:-1].split(':')
-            first_val_index = split_val_arr[0] or 0
-            last_val_index = split_val_arr[1] or len(arr)
+            first_val_index = int(split_val_arr[0]) if split_val_arr[0] else 0
+            last_val_index = int(split_val_arr[1]) if split_val_arr[1] else None
 
-            return arr[int(first_val_index):int(last_val_index)][0]
+            return first_val_index, last_val_index
         else:
             return key
 
-    def _convert_slices_view_data(self, data):
+    def __get_sliced_view_entries(self):
+        if self.__sliced_view_entries is None:
+            entries = {}
+            for data_type in self.__data_types:
+                entries[data_type] = [(self._parse_key_or_value(information['key']),
+                                       self._parse_key_or_value(information['value']),
+                                       information['value'])
+                                      for information in self.__config[data_type]]
+            self.__sliced_view_entries = entries
+
+        return self.__sliced_view_entries
+
+    def _convert_slices_view_data(self, config, data):
         dict_result, get_device_name_from_data, get_device_type_from_data = self._get_required_data('[', ']')
         try:
-            for data_type in self.__data_types:
-                for information in self.__config[data_type]:
-                    arr = data.split(self.__config['delimiter'])
+            arr = data.split(self.__config['delimiter'])
+            entries = self.__get_sliced_view_entries()
 
-                    val = self._get_key_or_value(information['value'], arr)
-                    key = self._get_key_or_value(information['key'], arr)
+            for data_type in self.__data_types:
+                section = {}
+                for key_spec, value_spec, raw_value in entries[data_type]:
+                    val = arr[value_spec[0]:value_spec[1]][0] if isinstance(value_spec, tuple) else value_spec
+                    key = arr[key_spec[0]:key_spec[1]][0] if isinstance(key_spec, tuple) else key_spec
 
-                    dict_result[self.__data_types[data_type]].append({key: val})
+                    section[key] = val
 
                     if get_device_name_from_data:
-                        if self.__config['devicePatternName'] == information['value']:
+                        if self.__config['devicePatternName'] == raw_value:
                             dict_result['deviceName'] = val
                     if get_device_type_from_data:
-                        if self.__config['devicePatternType'] == information['value']:
+                        if self.__config['devicePatternType'] == raw_value:
                             dict_result['deviceType'] = val
+
+                if section:
+                    dict_result[self.__data_types[data_type]].append(section)
         except Exception as e:
             self._log.error('Error in converter, for config: \n%s\n and message: \n%s\n %s', dumps(self.__config), data,
                             e)
 
         return dict_result
 
-    def _convert_json_file(self, data):
+    def _convert_json_file(self, config, data):
         dict_result = {"deviceName": None, "deviceType": None, "attributes": [], "telemetry": []}
 
         try:
-            if self.__config.get("devicePatternName") is not None:
-                device_name_tags = TBUtility.get_values(self.__config.get("devicePatternName"), data,
+            device_pattern_name = self.__config.get("devicePatternName")
+            if device_pattern_name is not None:
+                device_name_tags = TBUtility.get_values(device_pattern_name, data,
                                                         get_tag=True)
-                device_name_values = TBUtility.get_values(self.__config.get("devicePatternName"), data,
+                device_name_values = TBUtility.get_values(device_pattern_name, data,
                                                           expression_instead_none=True)
 
-                dict_result["deviceName"] = self.__config.get("devicePatternName")
+                dict_result["deviceName"] = device_pattern_name
+                is_valid_key = "${" in device_pattern_name and "}" in device_pattern_name
                 for (device_name_tag, device_name_value) in zip(device_name_tags, device_name_values):
-                    is_valid_key = "${" in self.__config.get("devicePatternName") and "}" in \
-                                   self.__config.get("devicePatternName")
                     dict_result['deviceName'] = dict_result['deviceName'].replace('${' + str(device_name_tag) + '}',
                                                                                   str(device_name_value)) \
                         if is_valid_key else device_name_tag
@@ -134,16 +184,16 @@ class FTPUplinkConverter(FTPConverter):
             else:
                 self._log.error("The expression for looking \"deviceName\" not found in config %s", dumps(self.__config))
 
-            if self.__config.get("devicePatternType") is not None:
-                device_type_tags = TBUtility.get_values(self.__config.get("devicePatternType"), data,
+            device_pattern_type = self.__config.get("devicePatternType")
+            if device_pattern_type is not None:
+                device_type_tags = TBUtility.get_values(device_pattern_type, data,
                                                         get_tag=True)
-                device_type_values = TBUtility.get_values(self.__config.get("devicePatternType"), data,
+                device_type_values = TBUtility.get_values(device_pattern_type, data,
                                                           expression_instead_none=True)
-                dict_result["deviceType"] = self.__config.get("devicePatternType")
+                dict_result["deviceType"] = device_pattern_type
 
+                is_valid_key = "${" in device_pattern_type and "}" in device_pattern_type
                 for (device_type_tag, device_type_value) in zip(device_type_tags, device_type_values):
-                    is_valid_key = "${" in self.__config.get("devicePatternType") and "}" in \
-                                   self.__config.get("devicePatternType")
                     dict_result["deviceType"] = dict_result["deviceType"].replace('${' + str(device_type_tag) + '}',
                                                                                   str(device_type_value)) \
                         if is_valid_key else device_type_tag
@@ -152,38 +202,40 @@ class FTPUplinkConverter(FTPConverter):
                             e)
 
         try:
-            for datatype in self.__data_types:
-                dict_result[self.__data_types[datatype]] = []
+            has_timestamp = isinstance(data, dict) and (
+                data.get("ts") is not None or data.get("timestamp") is not None)
+            timestamp = data.get('ts', data.get('timestamp', int(time()))) if has_timestamp else None
 
+            for datatype in self.__data_types:
                 for datatype_config in self.__config.get(datatype, []):
-                    values = TBUtility.get_values(datatype_config["value"], data, datatype_config["type"],
+                    key_expression = datatype_config["key"]
+                    value_expression = datatype_config["value"]
+                    value_type = datatype_config["type"]
+
+                    values = TBUtility.get_values(value_expression, data, value_type,
                                                   expression_instead_none=True)
-                    values_tags = TBUtility.get_values(datatype_config["value"], data, datatype_config["type"],
+                    values_tags = TBUtility.get_values(value_expression, data, value_type,
                                                        get_tag=True)
 
-                    keys = TBUtility.get_values(datatype_config["key"], data, datatype_config["type"],
+                    keys = TBUtility.get_values(key_expression, data, value_type,
                                                 expression_instead_none=True)
-                    keys_tags = TBUtility.get_values(datatype_config["key"], data, get_tag=True)
+                    keys_tags = TBUtility.get_values(key_expression, data, get_tag=True)
 
-                    full_key = datatype_config["key"]
+                    full_key = key_expression
+                    is_valid_key = "${" in key_expression and "}" in key_expression
                     for (key, key_tag) in zip(keys, keys_tags):
-                        is_valid_key = "${" in datatype_config["key"] and "}" in \
-                                       datatype_config["key"]
                         full_key = full_key.replace('${' + str(key_tag) + '}',
                                                     str(key)) if is_valid_key else key_tag
 
-                    full_value = datatype_config["value"]
+                    full_value = value_expression
+                    is_valid_value = "${" in value_expression and "}" in value_expression
                     for (value, value_tag) in zip(values, values_tags):
-                        is_valid_value = "${" in datatype_config["value"] and "}" in \
-                                         datatype_config["value"]
-
                         full_value = full_value.replace('${' + str(value_tag) + '}',
                                                         str(value)) if is_valid_value else str(value)
 
-                    if datatype == 'timeseries' and (
-                            data.get("ts") is not None or data.get("timestamp") is not None):
+                    if datatype == 'timeseries' and has_timestamp:
                         dict_result[self.__data_types[datatype]].append(
-                            {"ts": data.get('ts', data.get('timestamp', int(time()))),
+                            {"ts": timestamp,
                              'values': {full_key: full_value}})
                     else:
                         dict_result[self.__data_types[datatype]].append({full_key: full_value})
@@ -197,12 +249,7 @@ class FTPUplinkConverter(FTPConverter):
                                          end_stat_type='convertedBytesFromDevice')
     def convert(self, config, data):
         if data:
-            if config['file_ext'] == 'csv' or (
-                    config['file_ext'] == 'txt' and self.__config['txt_file_data_view'] == 'TABLE'):
-                return self._convert_table_view_data(config, data)
-            elif config['file_ext'] == 'txt' and self.__config['txt_file_data_view'] == 'SLICED':
-                return self._convert_slices_view_data(data)
-            elif config['file_ext'] == 'json':
-                return self._convert_json_file(data)
-            else:
+            file_converter = self.__converters_by_file_ext.get(config['file_ext'])
+            if file_converter is None:
                 raise Exception('Incorrect file extension or file data view mode')
+            return file_converter(config, data)
@@ -13,6 +13,7 @@
 #     limitations under the License.
 
 import re
+from threading import Lock
 
 
 class Device:
@@ -24,6 +25,8 @@ class Device:
         self.config = config
         self.converter = converter
         self.converter_for_sub = converter_for_sub
+        # poll and subscription threads may share one converter instance
+        self.converter_lock = Lock()
         self.values = {
             'timeseries': [],
             'attributes': []
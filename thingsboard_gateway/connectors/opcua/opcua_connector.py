@@ -14,10 +14,13 @@
 
 import asyncio
 import re
-from queue import Queue
+from collections import deque
+from logging import DEBUG
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from random import choice
 from string import ascii_lowercase
-from threading import Thread
+from threading import Event, Thread
 from time import sleep, monotonic
 
 from thingsboard_gateway.connectors.connector import Connector
@@ -42,6 +45,19 @@ from asyncua.ua.uaerrors import UaStatusCodeError, BadNodeIdUnknown, BadConnecti
 
 DEFAULT_UPLINK_CONVERTER = 'OpcUaUplinkConverter'
 
+MAX_SEND_DATA_BATCH_SIZE = 100
+TASK_RESULT_TIMEOUT = 10
+LOAD_NODES_CHUNK_SIZE = 64
+
+NODE_ID_PATTERN = re.compile(r"(ns=\d+;[isgb]=[^}]+)")
+REGEX_METACHARS_PATTERN = re.compile(r'[.^$*+?{}\[\]\\|()]')
+DEVICE_INFO_EXPRESSION_PATTERN = re.compile(r"\${([A-Za-z.:\\\d]+)}")
+
+
+@lru_cache(maxsize=512)
+def _browse_name_pattern(name):
+    return re.compile(re.escape(name))
+
 SECURITY_POLICIES = {
     "Basic128Rsa15": SecurityPolicyBasic128Rsa15,
     "Basic256": SecurityPolicyBasic256,
@@ -87,8 +103,11 @@ class OpcUaConnector(Connector, Thread):
 
         self.__enable_subscriptions = self.__server_conf.get('enableSubscriptions', True)
 
-        self.__data_to_send = Queue(-1)
-        self.__sub_data_to_convert = Queue(-1)
+        max_queue_size = self.__server_conf.get('maxQueueSize')
+        self.__data_to_send = deque(maxlen=max_queue_size)
+        self.__data_to_send_event = Event()
+        self.__sub_data_to_convert = deque(maxlen=max_queue_size)
+        self.__sub_data_to_convert_event = Event()
 
         try:
             self.__loop = asyncio.new_event_loop()
@@ -98,12 +117,18 @@ class OpcUaConnector(Connector, Thread):
 
         self.__client = None
         self.__subscription = None
+        self.__executor = None
 
         self.__connected = False
         self.__stopped = False
         self.daemon = True
 
         self.__device_nodes = []
+        self.__devices_by_name = {}
+        self.__nodes_by_sub_id = {}
+        self.__path_cache = {}
+        self.__poll_flat_nodes = []
+        self.__poll_layout = []
         self.__next_poll = 0
         self.__next_scan = 0
 
@@ -120,9 +145,18 @@ class OpcUaConnector(Connector, Thread):
         self.__connected = False
         self.__log.info("Stopping OPC-UA Connector")
 
+        # unblock the sending/converting threads waiting on their queues
+        self.__data_to_send.append(None)
+        self.__data_to_send_event.set()
+        self.__sub_data_to_convert.append(None)
+        self.__sub_data_to_convert_event.set()
+
         asyncio.run_coroutine_threadsafe(self.__disconnect(), self.__loop)
         asyncio.run_coroutine_threadsafe(self.__cancel_all_tasks(), self.__loop)
 
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+
         start_time = monotonic()
 
         while self.is_alive():
@@ -145,23 +179,53 @@ class OpcUaConnector(Connector, Thread):
         except Exception as e:
             self.__log.warning('%s could not be disconnected from OPC-UA Server: %s', self.name, e)
 
-    async def __reset_node(self, node):
+    def __reset_node_state(self, node):
+        """Synchronous part of a node reset; returns the subscription handle to release, if any."""
         node['valid'] = False
+        path = node.get('path')
+        if isinstance(path, list):
+            self.__path_cache.pop(tuple(path), None)
+
+        handle = None
         if node.get('sub_on', False):
+            handle = node['subscription']
+            node['subscription'] = None
+            node['sub_on'] = False
+
+            subscribers = self.__nodes_by_sub_id.get(node.get('id'))
+            if subscribers:
+                subscribers[:] = [subscriber for subscriber in subscribers if subscriber[2] is not node]
+                if not subscribers:
+                    self.__nodes_by_sub_id.pop(node['id'], None)
+
+        return handle
+
+    async def __reset_node(self, node):
+        handle = self.__reset_node_state(node)
+        if handle is not None and self.__subscription:
             try:
-                if self.__subscription:
-                    await self.__subscription.unsubscribe(node['subscription'])
+                await self.__subscription.unsubscribe(handle)
             except Exception as e:
                 self.__log.exception('Error unsubscribing on data change: %s', e)
-            node['subscription'] = None
-            node['sub_on'] = False
 
     async def __reset_nodes(self, device_name=None):
+        handles = []
         for device in self.__device_nodes:
             if device_name is None or device.name == device_name:
                 for section in ('attributes', 'timeseries'):
                     for node in device.values.get(section, []):
-                        await self.__reset_node(node)
+                        if not node.get('sub_on', False) and not node.get('valid', True):
+                            continue
+                        handle = self.__reset_node_state(node)
+                        if handle is not None:
+                            handles.append(handle)
+
+        if handles and self.__subscription:
+            results = await asyncio.gather(*(self.__subscription.unsubscribe(handle) for handle in handles),
+                                           return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    self.__log.error('Error unsubscribing on data change: %s', result)
 
         if device_name is None and self.__subscription:
             try:
@@ -194,6 +258,10 @@ class OpcUaConnector(Connector, Thread):
                                              daemon=True)
             sub_data_convert_thread.start()
 
+        self.__executor = ThreadPoolExecutor(max_workers=self.__server_conf.get('threadPoolSize', 64),
+                                             thread_name_prefix='opcua-exec')
+        self.__loop.set_default_executor(self.__executor)
+
         try:
             self.__loop.run_until_complete(self.start_client())
         except asyncio.CancelledError:
@@ -223,6 +291,7 @@ class OpcUaConnector(Connector, Thread):
                     await self.disconnect_if_connected()
                     continue
                 self.__connected = True
+                self.__path_cache.clear()
 
                 try:
                     await self.__client.load_data_type_definitions()
@@ -233,16 +302,16 @@ class OpcUaConnector(Connector, Thread):
                 scan_period = int(self.__server_conf.get('scanPeriodInMillis', 3600000) / 1000)
 
                 while not self.__stopped:
-                    if monotonic() >= self.__next_scan:
-                        self.__next_scan = monotonic() + scan_period
+                    now = monotonic()
+                    if now >= self.__next_scan:
+                        self.__next_scan = now + scan_period
                         await self.__scan_device_nodes()
 
-                    if monotonic() >= self.__next_poll:
-                        self.__next_poll = monotonic() + poll_period
+                    if now >= self.__next_poll:
+                        self.__next_poll = now + poll_period
                         await self.__poll_nodes()
 
-                    current_time = monotonic()
-                    time_to_sleep = min(self.__next_poll - current_time, self.__next_scan - current_time)
+                    time_to_sleep = min(self.__next_poll, self.__next_scan) - monotonic()
                     if time_to_sleep > 0:
                         await asyncio.sleep(time_to_sleep)
 
@@ -326,26 +395,37 @@ class OpcUaConnector(Connector, Thread):
 
     @staticmethod
     def is_regex_pattern(pattern):
-        return not re.fullmatch(pattern, pattern)
+        return REGEX_METACHARS_PATTERN.search(pattern) is not None
 
     async def __find_nodes(self, node_list, current_parent_node, nodes):
         assert len(node_list) > 0
         final = []
 
         children = await current_parent_node.get_children()
-        for node in children:
-            child_node = await node.read_browse_name()
+        browse_names = await asyncio.gather(*(node.read_browse_name() for node in children))
+
+        target_pattern = _browse_name_pattern(node_list[0])
+        target_name = node_list[0].split(':')[-1]
 
-            if re.fullmatch(re.escape(node_list[0]), child_node.Name) or node_list[0].split(':')[-1] == child_node.Name:
+        pending_subtrees = []
+        for node, child_node in zip(children, browse_names):
+            if target_pattern.fullmatch(child_node.Name) or target_name == child_node.Name:
                 new_nodes = [*nodes, f'{child_node.NamespaceIndex}:{child_node.Name}']
                 if len(node_list) == 1:
                     final.append(new_nodes)
                 else:
-                    final.extend(await self.__find_nodes(node_list[1:], current_parent_node=node, nodes=new_nodes))
+                    pending_subtrees.append(self.__find_nodes(node_list[1:], current_parent_node=node,
+                                                              nodes=new_nodes))
+
+        for subtree in await asyncio.gather(*pending_subtrees):
+            final.extend(subtree)
 
         return final
 
-    async def find_nodes(self, node_pattern, current_parent_node=None, nodes=[]):
+    async def find_nodes(self, node_pattern, current_parent_node=None, nodes=None):
+        if nodes is None:
+            nodes = []
+
         node_list = node_pattern.split('\\.')
 
         if current_parent_node is None:
@@ -360,6 +440,11 @@ class OpcUaConnector(Connector, Thread):
         if isinstance(path, str):
             path = path.split('\\.')
 
+        cache_key = tuple(path)
+        cached_result = self.__path_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+
         # find unresolved nodes
         u_node_count = len(tuple(filter(lambda u_node: len(u_node.split(':')) < 2, path)))
 
@@ -368,12 +453,19 @@ class OpcUaConnector(Connector, Thread):
         parent_node = await self.__client.nodes.root.get_child(resolved)
 
         unresolved = path[resolved_level:]
-        return await self.__find_nodes(unresolved, current_parent_node=parent_node, nodes=resolved)
+        result = await self.__find_nodes(unresolved, current_parent_node=parent_node, nodes=resolved)
+        if result:
+            self.__path_cache[cache_key] = result
+
+        return result
 
     async def _get_device_info_by_pattern(self, pattern, get_first=False):
+        if '${' not in pattern:
+            return pattern if get_first else [pattern]
+
         result = []
 
-        search_result = re.search(r"\${([A-Za-z.:\\\d]+)}", pattern)
+        search_result = DEVICE_INFO_EXPRESSION_PATTERN.search(pattern)
         if search_result:
             try:
                 group = search_result.group(0)
@@ -399,31 +491,67 @@ class OpcUaConnector(Connector, Thread):
         return result[0] if len(result) > 0 and get_first else result
 
     def __convert_sub_data(self):
+        sub_data = self.__sub_data_to_convert
+        sub_data_event = self.__sub_data_to_convert_event
+        data_to_send = self.__data_to_send
+        data_to_send_event = self.__data_to_send_event
+        nodes_by_sub_id = self.__nodes_by_sub_id
+
         while not self.__stopped:
-            if not self.__sub_data_to_convert.empty():
-                sub_node, data = self.__sub_data_to_convert.get()
-
-                for device in self.__device_nodes:
-                    for section in ('attributes', 'timeseries'):
-                        for node in device.values.get(section, []):
-                            if node.get('id') == sub_node.__str__():
-                                converter_data = device.converter_for_sub.convert({'section': section, 'key': node['key']},
-                                                                                  data.monitored_item.Value)
-
-                                if converter_data:
-                                    self.__data_to_send.put(*converter_data)
-                                    device.converter_for_sub.clear_data()
-            else:
-                sleep(.05)
+            if not sub_data:
+                sub_data_event.wait(.5)
+                sub_data_event.clear()
+                continue
+
+            # drain everything queued by the subscription handler in one pass, so a burst of
+            # notifications costs one wakeup instead of one loop iteration per sample
+            batch = []
+            stop_requested = False
+            while True:
+                try:
+                    item = sub_data.popleft()
+                except IndexError:
+                    break
+
+                if item is None:
+                    stop_requested = True
+                    break
+
+                batch.append(item)
+
+            data_queued = False
+            for sub_node, data in batch:
+                for device, section, node in nodes_by_sub_id.get(sub_node.__str__(), []):
+                    with device.converter_lock:
+                        converter_data = device.converter_for_sub.convert({'section': section, 'key': node['key']},
+                                                                          data.monitored_item.Value)
+
+                        if converter_data:
+                            if isinstance(converter_data, (list, tuple)):
+                                data_to_send.extend(converter_data)
+                            else:
+                                data_to_send.append(converter_data)
+                            data_queued = True
+
+                            # only custom converters accumulate state between calls
+                            clear_data = getattr(device.converter_for_sub, 'clear_data', None)
+                            if clear_data is not None:
+                                clear_data()
+
+            if data_queued:
+                data_to_send_event.set()
+
+            if stop_requested:
+                break
 
     async def __scan_device_nodes(self):
         await self._create_new_devices()
         await self._load_devices_nodes()
 
     async def _create_new_devices(self):
-        existing_devices = list(map(lambda dev: dev.name, self.__device_nodes))
+        existing_devices = {device.name for device in self.__device_nodes}
 
-        scanned_devices = []
+        scanned_devices = set()
         for device in self.__config.get('mapping', []):
             nodes = await self.find_nodes(device['deviceNodePattern'])
             self.__log.debug('Found devices: %s', nodes)
@@ -432,7 +560,7 @@ class OpcUaConnector(Connector, Thread):
                 device.get('deviceInfo', {}).get('deviceNameExpression'))
 
             for device_name in device_names:
-                scanned_devices.append(device_name)
+                scanned_devices.add(device_name)
                 if device_name not in existing_devices:
                     for node in nodes:
                         converter = self.__load_converter(device)
@@ -440,116 +568,218 @@ class OpcUaConnector(Connector, Thread):
                             device.get('deviceInfo', {}).get('deviceProfileExpression', 'default'),
                             get_first=True)
                         device_config = {**device, 'device_name': device_name, 'device_type': device_type}
+                        converter_instance = converter(device_config, self.__log)
                         self.__device_nodes.append(
                             Device(path=node, name=device_name, config=device_config,
-                                   converter=converter(device_config, self.__log),
-                                   converter_for_sub=converter(device_config,
-                                                               self.__log) if self.__enable_subscriptions else None,
+                                   converter=converter_instance,
+                                   converter_for_sub=converter_instance if self.__enable_subscriptions else None,
                                    logger=self.__log))
+                        self.__devices_by_name.setdefault(device_name, self.__device_nodes[-1])
 
                         self.__log.info('Added device node: %s', device_name)
 
-        for device_name in existing_devices:
-            if device_name not in scanned_devices:
-                await self.__reset_nodes(device_name)
+        for device_name in existing_devices - scanned_devices:
+            await self.__reset_nodes(device_name)
 
         self.__log.debug('Device nodes: %s', self.__device_nodes)
 
     async def _load_devices_nodes(self):
+        node_configs = []
         for device in self.__device_nodes:
             device.nodes = []
             for section in ('attributes', 'timeseries'):
                 for node in device.values.get(section, []):
-                    try:
-                        path = node.get('qualified_path', node['path'])
-                        if isinstance(path, str) and re.match(r"(ns=\d+;[isgb]=[^}]+)", path):
-                            found_node = self.__client.get_node(path)
-                        else:
-                            if len(path[-1].split(':')) != 2:
-                                qualified_path = await self.find_node_name_space_index(path)
-                                if len(qualified_path) == 0:
-                                    if node.get('valid', True):
-                                        self.__log.warning('Node not found; device: %s, key: %s, path: %s',
-                                                           device.name,
-                                                           node['key'], node['path'])
-                                        await self.__reset_node(node)
-                                    continue
-                                elif len(qualified_path) > 1:
-                                    self.__log.warning(
-                                        'Multiple matching nodes found; device: %s, key: %s, path: %s; %s',
-                                        device.name,
-                                        node['key'], node['path'], qualified_path)
-                                node['qualified_path'] = qualified_path[0]
-                                path = qualified_path[0]
-
-                            found_node = await self.__client.nodes.root.get_child(path)
-
-                        device.nodes.append({'node': found_node, 'key': node['key'], 'section': section})
-
-                        if node.get('valid') is None or (node.get('valid') and not self.__enable_subscriptions):
-                            if self.__enable_subscriptions and not node.get('sub_on', False) and not self.__stopped:
-                                if self.__subscription is None:
-                                    self.__subscription = await self.__client.create_subscription(1, SubHandler(
-                                        self.__sub_data_to_convert, self.__log))
-                                handle = await self.__subscription.subscribe_data_change(found_node)
-                                node['subscription'] = handle
-                                node['sub_on'] = True
-                                node['id'] = found_node.nodeid.to_string()
-                                self.__log.info("Subscribed on data change; device: %s, key: %s, path: %s",
-                                                device.name,
-                                                node['key'], node['id'])
-
-                            node['valid'] = True
-                    except ConnectionError as e:
-                        raise e
-                    except (BadNodeIdUnknown, BadConnectionClosed, BadInvalidState, BadAttributeIdInvalid,
-                            BadCommunicationError, BadOutOfService, BadNoMatch, BadUnexpectedError,
-                            UaStatusCodeErrors,
-                            BadWaitingForInitialData):
+                    node_configs.append((device, section, node))
+
+        # device.nodes is already cleared above, so the layout must be rebuilt even if the
+        # scan aborts mid-way - a partial but consistent layout cannot misattribute values,
+        # while the previous one would slice reads against nodes that no longer match it
+        try:
+            pending_sub = []
+            for start in range(0, len(node_configs), LOAD_NODES_CHUNK_SIZE):
+                batch = node_configs[start:start + LOAD_NODES_CHUNK_SIZE]
+                results = await asyncio.gather(
+                    *(self.__load_device_node(device, section, node) for device, section, node in batch),
+                    return_exceptions=True)
+                for result in results:
+                    if isinstance(result, BaseException):
+                        # only ConnectionError (and cancellation) escape the per-node handling
+                        raise result
+                    if result is not None:
+                        pending_sub.append(result)
+
+            if pending_sub:
+                await self.__subscribe_nodes(pending_sub)
+        finally:
+            self.__rebuild_poll_layout()
+
+    async def __load_device_node(self, device, section, node):
+        """Resolves one configured node, appends it to device.nodes and returns
+        (device, section, node, found_node) if a data change subscription is still needed."""
+        try:
+            path = node.get('qualified_path', node['path'])
+            if isinstance(path, str) and NODE_ID_PATTERN.match(path):
+                found_node = self.__client.get_node(path)
+            else:
+                if len(path[-1].split(':')) != 2:
+                    qualified_path = await self.find_node_name_space_index(path)
+                    if len(qualified_path) == 0:
                         if node.get('valid', True):
-                            self.__log.warning('Node not found (2); device: %s, key: %s, path: %s', device.name,
+                            self.__log.warning('Node not found; device: %s, key: %s, path: %s',
+                                               device.name,
                                                node['key'], node['path'])
                             await self.__reset_node(node)
-                    except UaStatusCodeError as uae:
-                        if node.get('valid', True):
-                            self.__log.exception('Node status code error: %s', uae)
-                            await self.__reset_node(node)
-                    except Exception as e:
-                        if node.get('valid', True):
-                            self.__log.exception(e)
-                            await self.__reset_node(node)
+                        return None
+                    elif len(qualified_path) > 1:
+                        self.__log.warning(
+                            'Multiple matching nodes found; device: %s, key: %s, path: %s; %s',
+                            device.name,
+                            node['key'], node['path'], qualified_path)
+                    node['qualified_path'] = qualified_path[0]
+                    path = qualified_path[0]
+
+                found_node = await self.__client.nodes.root.get_child(path)
+
+            device.nodes.append({'node': found_node, 'key': node['key'], 'section': section})
+
+            if node.get('valid') is None or (node.get('valid') and not self.__enable_subscriptions):
+                if self.__enable_subscriptions and not node.get('sub_on', False) and not self.__stopped:
+                    return device, section, node, found_node
+
+                node['valid'] = True
+        except ConnectionError as e:
+            raise e
+        except (BadNodeIdUnknown, BadConnectionClosed, BadInvalidState, BadAttributeIdInvalid,
+                BadCommunicationError, BadOutOfService, BadNoMatch, BadUnexpectedError,
+                UaStatusCodeErrors,
+                BadWaitingForInitialData):
+            if node.get('valid', True):
+                self.__log.warning('Node not found (2); device: %s, key: %s, path: %s', device.name,
+                                   node['key'], node['path'])
+                await self.__reset_node(node)
+        except UaStatusCodeError as uae:
+            if node.get('valid', True):
+                self.__log.exception('Node status code error: %s', uae)
+                await self.__reset_node(node)
+        except Exception as e:
+            if node.get('valid', True):
+                self.__log.exception(e)
+                await self.__reset_node(node)
+
+        return None
+
+    async def __subscribe_nodes(self, pending_sub):
+        if self.__subscription is None:
+            self.__subscription = await self.__client.create_subscription(1, SubHandler(
+                self.__sub_data_to_convert, self.__sub_data_to_convert_event, self.__log))
+
+        # one CreateMonitoredItems request covers every node; failed items come back as StatusCode
+        handles = await self.__subscription.subscribe_data_change(
+            [found_node for _, _, _, found_node in pending_sub])
+
+        for (device, section, node, found_node), handle in zip(pending_sub, handles):
+            if isinstance(handle, asyncua.ua.StatusCode):
+                if node.get('valid', True):
+                    self.__log.warning('Error subscribing on data change; device: %s, key: %s: %s',
+                                       device.name, node['key'], handle)
+                    await self.__reset_node(node)
+                continue
+
+            node['subscription'] = handle
+            node['sub_on'] = True
+            node['id'] = found_node.nodeid.to_string()
+            self.__nodes_by_sub_id.setdefault(node['id'], []).append((device, section, node))
+            self.__log.info("Subscribed on data change; device: %s, key: %s, path: %s",
+                            device.name,
+                            node['key'], node['id'])
+            node['valid'] = True
+
+    def __rebuild_poll_layout(self):
+        flat_nodes = []
+        layout = []
+        for device in self.__device_nodes:
+            start = len(flat_nodes)
+            flat_nodes.extend(node_config['node'] for node_config in device.nodes)
+            layout.append((device, start, len(flat_nodes)))
+        self.__poll_flat_nodes = flat_nodes
+        self.__poll_layout = layout
 
     async def __poll_nodes(self):
-        all_nodes = [node_config['node'] for device in self.__device_nodes for node_config in device.nodes]
+        all_nodes = self.__poll_flat_nodes
 
         if len(all_nodes) > 0:
-            values = await self.__client.read_attributes(all_nodes)
-
-            converted_nodes_count = 0
-            for device in self.__device_nodes:
-                nodes_count = len(device.nodes)
-                device_values = values[converted_nodes_count:converted_nodes_count + nodes_count]
-                converted_nodes_count += nodes_count
-                converter_data = device.converter.convert(device.nodes, device_values)
+            chunk_size = self.__server_conf.get('readChunkSize', 256)
+            chunks = [all_nodes[i:i + chunk_size] for i in range(0, len(all_nodes), chunk_size)]
+            chunk_results = await asyncio.gather(*(self.__client.read_attributes(chunk) for chunk in chunks),
+                                                 return_exceptions=True)
+
+            values = []
+            for chunk, chunk_result in zip(chunks, chunk_results):
+                if isinstance(chunk_result, (ConnectionError, BadSessionClosed)):
+                    raise chunk_result
+                if isinstance(chunk_result, Exception):
+                    self.__log.error('Error reading chunk of %s nodes: %s', len(chunk), chunk_result)
+                    values.extend([None] * len(chunk))
+                else:
+                    values.extend(chunk_result)
+
+            data_to_send = self.__data_to_send
+            data_to_send_event = self.__data_to_send_event
+            for device, start, end in self.__poll_layout:
+                with device.converter_lock:
+                    converter_data = device.converter.convert(device.nodes, values[start:end])
                 if converter_data:
-                    self.__data_to_send.put(converter_data)
+                    data_to_send.append(converter_data)
+                    data_to_send_event.set()
 
-            self.__log.debug('Converted nodes values count: %s', converted_nodes_count)
+            if self.__log.isEnabledFor(DEBUG):
+                self.__log.debug('Converted nodes values count: %s', len(all_nodes))
         else:
             self.__log.info('No nodes to poll')
 
     def __send_data(self):
+        data_to_send = self.__data_to_send
+        data_event = self.__data_to_send_event
+        statistics = self.statistics
+        send_to_storage = self.__gateway.send_to_storage
+        log = self.__log
+
         while not self.__stopped:
-            if not self.__data_to_send.empty():
-                data = self.__data_to_send.get()
-                self.statistics['MessagesReceived'] = self.statistics['MessagesReceived'] + 1
-                self.__gateway.send_to_storage(self.get_name(), self.get_id(), data)
-                self.statistics['MessagesSent'] = self.statistics['MessagesSent'] + 1
-                self.__log.debug('Count data packs to ThingsBoard: %s', self.statistics['MessagesSent'])
-            else:
-                sleep(.05)
+            if not data_to_send:
+                data_event.wait(.5)
+                data_event.clear()
+                continue
 
-    async def get_shared_attr_node_id(self, path, result={}):
+            try:
+                data = data_to_send.popleft()
+            except IndexError:
+                continue
+
+            if data is None:
+                break
+
+            batch = [data]
+            while len(batch) < MAX_SEND_DATA_BATCH_SIZE:
+                try:
+                    data = data_to_send.popleft()
+                except IndexError:
+                    break
+                if data is None:
+                    break
+                batch.append(data)
+
+            connector_name = self.get_name()
+            connector_id = self.get_id()
+            statistics['MessagesReceived'] += len(batch)
+            for data in batch:
+                send_to_storage(connector_name, connector_id, data)
+            statistics['MessagesSent'] += len(batch)
+            if log.isEnabledFor(DEBUG):
+                log.debug('Count data packs to ThingsBoard: %s', statistics['MessagesSent'])
+
+    async def get_shared_attr_node_id(self, path, result=None):
+        if result is None:
+            result = {}
         try:
             q_path = await self.find_node_name_space_index(path)
             result['result'] = await self.__client.nodes.root.get_child(q_path[0])
@@ -559,25 +789,23 @@ class OpcUaConnector(Connector, Thread):
     def on_attributes_update(self, content):
         self.__log.debug(content)
         try:
-            device = tuple(filter(lambda i: i.name == content['device'], self.__device_nodes))[0]
+            device = self.__devices_by_name[content['device']]
 
             for (key, value) in content['data'].items():
                 for attr_update in device.config['attributes_updates']:
                     if attr_update['key'] == key:
                         result = {}
-                        task = self.__loop.create_task(
+                        asyncio.run_coroutine_threadsafe(
                             self.get_shared_attr_node_id(
-                                device.path + attr_update['value'].replace('\\', '').split('.'), result))
-
-                        while not task.done():
-                            sleep(.1)
+                                device.path + attr_update['value'].replace('\\', '').split('.'), result),
+                            self.__loop).result(TASK_RESULT_TIMEOUT)
 
                         if result.get('error'):
                             self.__log.error('Node not found! (%s)', result['error'])
                             return
 
                         node_id = result['result']
-                        self.__loop.create_task(self.__write_value(node_id, value))
+                        asyncio.run_coroutine_threadsafe(self.__write_value(node_id, value), self.__loop)
                         return
         except Exception as e:
             self.__log.exception(e)
@@ -625,22 +853,18 @@ class OpcUaConnector(Connector, Thread):
 
                     result = {}
                     if rpc_method == 'get':
-                        task = self.__loop.create_task(self.__read_value(full_path, result))
-
-                        while not task.done():
-                            sleep(.2)
+                        asyncio.run_coroutine_threadsafe(self.__read_value(full_path, result),
+                                                         self.__loop).result(TASK_RESULT_TIMEOUT)
                     elif rpc_method == 'set':
                         value = args_list[2].split('=')[-1]
-                        task = self.__loop.create_task(self.__write_value(full_path, value, result))
-
-                        while not task.done():
-                            sleep(.2)
+                        asyncio.run_coroutine_threadsafe(self.__write_value(full_path, value, result),
+                                                         self.__loop).result(TASK_RESULT_TIMEOUT)
 
                     self.__gateway.send_rpc_reply(device=device,
                                                   req_id=content['data'].get('id'),
                                                   content={content['data']['method']: result})
                 else:
-                    device = tuple(filter(lambda i: i.name == content['device'], self.__device_nodes))[0]
+                    device = self.__devices_by_name[content['device']]
 
                     for rpc in device.config['rpc_methods']:
                         if rpc['method'] == content["data"]['method']:
@@ -651,16 +875,15 @@ class OpcUaConnector(Connector, Thread):
 
                             try:
                                 result = {}
-                                task = self.__loop.create_task(
-                                    self.__call_method(device.path, method_name, arguments, result))
-
-                                while not task.done():
-                                    sleep(.2)
+                                asyncio.run_coroutine_threadsafe(
+                                    self.__call_method(device.path, method_name, arguments, result),
+                                    self.__loop).result(TASK_RESULT_TIMEOUT)
 
                                 self.__gateway.send_rpc_reply(content["device"],
                                                               content["data"]["id"],
                                                               {content["data"]["method"]: result, "code": 200})
-                                self.__log.debug("method %s result is: %s", rpc['method'], result)
+                                if self.__log.isEnabledFor(DEBUG):
+                                    self.__log.debug("method %s result is: %s", rpc['method'], result)
                             except Exception as e:
                                 self.__log.exception(e)
                                 self.__gateway.send_rpc_reply(content["device"], content["data"]["id"],
@@ -672,31 +895,39 @@ class OpcUaConnector(Connector, Thread):
                                                            "code": 404})
             else:
                 results = []
-                for device in self.__device_nodes:
+                arguments = content['data']['params']["arguments"]
+                rpc_id = content["data"]["id"]
+
+                # one gather overlaps all method calls on the loop, collapsing N round-trips into ~1
+                device_results = [(device, {}) for device in self.__device_nodes]
+                call_results = asyncio.run_coroutine_threadsafe(
+                    asyncio.gather(
+                        *(self.__call_method(device.path, rpc_method, arguments, result)
+                          for device, result in device_results),
+                        return_exceptions=True),
+                    self.__loop).result(TASK_RESULT_TIMEOUT)
+
+                for (device, result), call_result in zip(device_results, call_results):
                     content['device'] = device.name
 
-                    arguments = content['data']['params']["arguments"]
+                    if isinstance(call_result, BaseException):
+                        self.__log.exception(call_result)
+                        self.__gateway.send_rpc_reply(device.name, rpc_id,
+                                                      {"error": str(call_result), "code": 500})
+                        results.append({"error": str(call_result)})
+                        continue
 
-                    try:
-                        result = {}
-                        task = self.__loop.create_task(
-                            self.__call_method(device.path, rpc_method, arguments, result))
-
-                        while not task.done():
-                            sleep(.2)
-
-                        results.append(result)
+                    results.append(result)
+                    if self.__log.isEnabledFor(DEBUG):
                         self.__log.debug("method %s result is: %s", rpc_method, result)
-                    except Exception as e:
-                        self.__log.exception(e)
-                        self.__gateway.send_rpc_reply(content["device"], content["data"]["id"],
-                                                      {"error": str(e), "code": 500})
 
                 return results
         except Exception as e:
             self.__log.exception(e)
 
-    async def __write_value(self, path, value, result={}):
+    async def __write_value(self, path, value, result=None):
+        if result is None:
+            result = {}
         try:
             var = path
             if isinstance(path, str):
@@ -706,14 +937,18 @@ class OpcUaConnector(Connector, Thread):
         except Exception as e:
             result['error'] = e.__str__()
 
-    async def __read_value(self, path, result={}):
+    async def __read_value(self, path, result=None):
+        if result is None:
+            result = {}
         try:
             var = self.__client.get_node(path)
             result['value'] = await var.read_value()
         except Exception as e:
             result['error'] = e.__str__()
 
-    async def __call_method(self, path, method_name, arguments, result={}):
+    async def __call_method(self, path, method_name, arguments, result=None):
+        if result is None:
+            result = {}
         try:
             var = await self.__client.nodes.root.get_child(path)
             method_id = '{}:{}'.format(var.nodeid.NamespaceIndex, method_name)
@@ -724,6 +959,11 @@ class OpcUaConnector(Connector, Thread):
     def update_converter_config(self, converter_name, config):
         self.__log.debug('Received remote converter configuration update for %s with configuration %s', converter_name,
                          config)
+        mapping = self.__config.get('mapping', [])
+        mapping_by_pattern = {}
+        for node_config in mapping:
+            mapping_by_pattern.setdefault(node_config['deviceNodePattern'], []).append(node_config)
+
         for device in self.__device_nodes:
             if device.converter.__class__.__name__ == converter_name:
                 device.config.update(config)
@@ -731,19 +971,23 @@ class OpcUaConnector(Connector, Thread):
                 self.__log.info('Updated converter configuration for: %s with configuration %s',
                                 converter_name, device.config)
 
-                for node_config in self.__config['mapping']:
-                    if node_config['deviceNodePattern'] == device.config['deviceNodePattern']:
-                        node_config.update(config)
+                for node_config in mapping_by_pattern.get(device.config['deviceNodePattern'], ()):
+                    node_config.update(config)
 
                 self.__gateway.update_connector_config_file(self.name, {'server': self.__server_conf,
-                                                                        'mapping': self.__config.get('mapping', [])})
+                                                                        'mapping': mapping})
 
 
 class SubHandler:
-    def __init__(self, queue, logger):
+    def __init__(self, queue, queue_event, logger):
         self.__log = logger
-        self.__queue = queue
+        # bound methods are resolved once here, datachange_notification runs on the asyncua
+        # network thread for every sample and must stay as cheap as possible
+        self.__append = queue.append
+        self.__notify = queue_event.set
 
     def datachange_notification(self, node, _, data):
-        self.__log.debug("New data change event %s %s", node, data)
-        self.__queue.put((node, data))
+        if self.__log.isEnabledFor(DEBUG):
+            self.__log.debug("New data change event %s %s", node, data)
+        self.__append((node, data))
+        self.__notify()
@@ -12,100 +12,163 @@
 #     See the License for the specific language governing permissions and
 #     limitations under the License.
 
+from re import findall
 from time import time
 
-from simplejson import dumps
+try:
+    from orjson import dumps as _orjson_dumps
+
+    def dumps(obj):
+        return _orjson_dumps(obj).decode()
+except ImportError:
+    from simplejson import dumps
 
 from thingsboard_gateway.connectors.rest.rest_converter import RESTConverter
 from thingsboard_gateway.tb_utility.tb_utility import TBUtility
 from thingsboard_gateway.gateway.statistics_service import StatisticsService
 
 
+class _CompiledExpression:
+    """Parses a ${...} template expression once so convert() only resolves the data-dependent values."""
+
+    __slots__ = ('expression', 'tags', 'has_template', '__sub_expressions', '__append_literal', '__pure_tag')
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.__sub_expressions = findall(r'\$\{[${A-Za-z0-9. ^\]\[*_:"-]*\}', expression)
+        self.__append_literal = '${' not in expression
+        self.has_template = '${' in expression and '}' in expression
+
+        tags = [TBUtility.get_value(sub_expression, get_tag=True) for sub_expression in self.__sub_expressions]
+        if self.__append_literal:
+            tags.append(expression)
+        self.tags = tuple(tags)
+
+        # expressions like '${temperature}' need no template machinery when the tag is a
+        # plain top-level key, a direct dict lookup resolves them
+        self.__pure_tag = None
+        if len(self.__sub_expressions) == 1 and self.__sub_expressions[0] == expression \
+                and self.tags[0] and ' ' not in self.tags[0]:
+            self.__pure_tag = self.tags[0]
+
+    def get_values(self, body, value_type="string", expression_instead_none=False):
+        tag = self.__pure_tag
+        if tag is not None and isinstance(body, dict) and tag in body:
+            if value_type.lower() == "string":
+                return [str(body[tag])]
+            value = body.get(tag)
+            if expression_instead_none and value is None:
+                value = self.expression
+            return [value]
+
+        values = [TBUtility.get_value(sub_expression, body, value_type=value_type,
+                                      expression_instead_none=expression_instead_none)
+                  for sub_expression in self.__sub_expressions]
+        if self.__append_literal:
+            values.append(self.expression)
+        return values
+
+
 class JsonRESTUplinkConverter(RESTConverter):
 
     def __init__(self, config, logger):
         self._log = logger
         self.__config = config
+        # serialized lazily, the endpoint handlers create a converter per request and most never log errors
+        self.__config_dump = None
+        device_name_expression = config.get("deviceNameExpression")
+        self.__device_name_expression = \
+            _CompiledExpression(device_name_expression) if device_name_expression is not None else None
+        device_type_expression = config.get("deviceTypeExpression")
+        self.__device_type_expression = \
+            _CompiledExpression(device_type_expression) if device_type_expression is not None else None
+
+        datapoints = []
+        for datatype, result_section in (("attributes", "attributes"), ("timeseries", "telemetry")):
+            entries = []
+            for datatype_config in config.get(datatype, []):
+                try:
+                    entries.append((_CompiledExpression(datatype_config["key"]),
+                                    _CompiledExpression(datatype_config["value"]),
+                                    datatype_config["type"]))
+                except KeyError as e:
+                    self._log.error('Invalid config for %s (key %s not found)', datatype_config, e)
+            datapoints.append((datatype, result_section, tuple(entries)))
+        self.__datapoints = tuple(datapoints)
+
+    def __get_config_dump(self):
+        if self.__config_dump is None:
+            self.__config_dump = dumps(self.__config)
+        return self.__config_dump
 
     @StatisticsService.CollectStatistics(start_stat_type='receivedBytesFromDevices',
                                          end_stat_type='convertedBytesFromDevice')
     def convert(self, config, data):
-        datatypes = {"attributes": "attributes",
-                     "timeseries": "telemetry"}
         dict_result = {"deviceName": None, "deviceType": None, "attributes": [], "telemetry": []}
 
         try:
-            if self.__config.get("deviceNameExpression") is not None:
-                device_name_tags = TBUtility.get_values(self.__config.get("deviceNameExpression"), data, get_tag=True)
-                device_name_values = TBUtility.get_values(self.__config.get("deviceNameExpression"), data,
-                                                          expression_instead_none=True)
-                dict_result["deviceName"] = self.__config.get("deviceNameExpression")
-                for (device_name_tag, device_name_value) in zip(device_name_tags, device_name_values):
-                    is_valid_key = "${" in self.__config.get("deviceNameExpression") and "}" in \
-                                   self.__config.get("deviceNameExpression")
+            device_name_expression = self.__device_name_expression
+            if device_name_expression is not None:
+                device_name_values = device_name_expression.get_values(data, expression_instead_none=True)
+                dict_result["deviceName"] = device_name_expression.expression
+                is_valid_key = device_name_expression.has_template
+                for (device_name_tag, device_name_value) in zip(device_name_expression.tags, device_name_values):
                     dict_result['deviceName'] = dict_result['deviceName'].replace('${' + str(device_name_tag) + '}',
                                                                                   str(device_name_value)) \
                         if is_valid_key else device_name_tag
             else:
                 self._log.error("The expression for looking \"deviceName\" not found in config %s",
-                                dumps(self.__config))
-
-            if self.__config.get("deviceTypeExpression") is not None:
-                device_type_tags = TBUtility.get_values(self.__config.get("deviceTypeExpression"), data, get_tag=True)
-                device_type_values = TBUtility.get_values(self.__config.get("deviceTypeExpression"), data,
-                                                          expression_instead_none=True)
-                dict_result["deviceType"] = self.__config.get("deviceTypeExpression")
-                for (device_type_tag, device_type_value) in zip(device_type_tags, device_type_values):
-                    is_valid_key = "${" in self.__config.get("deviceTypeExpression") and "}" in \
-                                   self.__config.get("deviceTypeExpression")
+                                self.__get_config_dump())
+
+            device_type_expression = self.__device_type_expression
+            if device_type_expression is not None:
+                device_type_values = device_type_expression.get_values(data, expression_instead_none=True)
+                dict_result["deviceType"] = device_type_expression.expression
+                is_valid_key = device_type_expression.has_template
+                for (device_type_tag, device_type_value) in zip(device_type_expression.tags, device_type_values):
                     dict_result["deviceType"] = dict_result["deviceType"].replace('${' + str(device_type_tag) + '}',
                                                                                   str(device_type_value)) \
                         if is_valid_key else device_type_tag
             else:
                 self._log.error("The expression for looking \"deviceType\" not found in config %s",
-                                dumps(self.__config))
+                                self.__get_config_dump())
         except Exception as e:
-            self._log.error('Error in converter, for config: \n%s\n and message: \n%s\n %s', dumps(self.__config), data,
-                            e)
+            self._log.error('Error in converter, for config: \n%s\n and message: \n%s\n %s', self.__get_config_dump(),
+                            data, e)
 
         try:
-            for datatype in datatypes:
-                dict_result[datatypes[datatype]] = []
-                for datatype_config in self.__config.get(datatype, []):
-                    values = TBUtility.get_values(datatype_config["value"], data, datatype_config["type"],
-                                                  expression_instead_none=False)
-                    values_tags = TBUtility.get_values(datatype_config["value"], data, datatype_config["type"],
-                                                       get_tag=True)
-
-                    keys = TBUtility.get_values(datatype_config["key"], data, datatype_config["type"],
-                                                expression_instead_none=False)
-                    keys_tags = TBUtility.get_values(datatype_config["key"], data, get_tag=True)
-
-                    full_key = datatype_config['key']
-                    for (key_tag, key) in zip(keys_tags, keys):
-                        is_valid_key = "${" in datatype_config["key"] and "}" in \
-                                       datatype_config["key"]
+            has_timestamp = isinstance(data, dict) and (
+                data.get("ts") is not None or data.get("timestamp") is not None)
+            timestamp = data.get('ts', data.get('timestamp', int(time()))) if has_timestamp else None
+
+            for datatype, result_section, datapoints in self.__datapoints:
+                for key_expression, value_expression, value_type in datapoints:
+                    values = value_expression.get_values(data, value_type,
+                                                         expression_instead_none=False)
+                    keys = key_expression.get_values(data, value_type,
+                                                     expression_instead_none=False)
+
+                    is_valid_key = key_expression.has_template
+                    full_key = key_expression.expression
+                    for (key_tag, key) in zip(key_expression.tags, keys):
                         full_key = full_key.replace('${' + str(key_tag) + '}',
                                                     str(key)) if is_valid_key else key
 
-                    full_value = datatype_config['value']
-                    for (value_tag, value) in zip(values_tags, values):
-                        is_valid_value = "${" in datatype_config["value"] and "}" in \
-                                         datatype_config["value"]
-
+                    is_valid_value = value_expression.has_template
+                    full_value = value_expression.expression
+                    for (value_tag, value) in zip(value_expression.tags, values):
                         full_value = full_value.replace('${' + str(value_tag) + '}',
                                                         str(value)) if is_valid_value else value
 
                     if full_key != 'None' and full_value != 'None':
-                        if datatype == 'timeseries' and (
-                                data.get("ts") is not None or data.get("timestamp") is not None):
-                            dict_result[datatypes[datatype]].append(
-                                {"ts": data.get('ts', data.get('timestamp', int(time()))),
+                        if datatype == 'timeseries' and has_timestamp:
+                            dict_result[result_section].append(
+                                {"ts": timestamp,
                                  'values': {full_key: full_value}})
                         else:
-                            dict_result[datatypes[datatype]].append({full_key: full_value})
+                            dict_result[result_section].append({full_key: full_value})
         except Exception as e:
-            self._log.error('Error in converter, for config: \n%s\n and message: \n%s\n %s', dumps(self.__config),
+            self._log.error('Error in converter, for config: \n%s\n and message: \n%s\n %s', self.__get_config_dump(),
                             str(data), e)
 
         return dict_result